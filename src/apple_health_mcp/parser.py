@@ -1,10 +1,21 @@
+import math
+import operator
 import os
+import queue
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any
 from zoneinfo import ZoneInfo
 
 from lxml import etree  # type: ignore[import-untyped]
+from sqlalchemy import Connection, Engine, bindparam, func, insert, text
+from sqlalchemy.schema import CreateIndex, DropIndex
 from sqlmodel import Session, SQLModel, create_engine, select
 from tqdm import tqdm
 
@@ -30,50 +41,182 @@ from .models import (
     WorkoutStatistics,
 )
 
+# Element events as (tag, attributes) pairs, attributes are None on end events
+_EventChunk = list[tuple[str, dict[str, str] | None]]
+
+# Timezone parsed datetimes are converted to, resolved once
+_ZURICH = ZoneInfo("Europe/Zurich")
+
+# Model indexes of tables that are only written during an import, so an
+# initial import builds them once at the end instead of row by row
+_DEFERRED_INDEXES = [
+    *MetadataEntry.__table__.indexes,  # type: ignore[attr-defined]
+    *InstantaneousBeatsPerMinute.__table__.indexes,  # type: ignore[attr-defined]
+]
+
+# Eye side lookup for Prescription elements
+_EYE_MAP = {"left": EyeSide.LEFT, "right": EyeSide.RIGHT}
+
+
+@lru_cache
+def _multi_row_insert_sql(table: str, columns: tuple[str, ...], rows: int) -> str:
+    """Build an INSERT statement with a VALUES placeholder group per row.
+
+    Table and column names are expected to be quoted already.
+    """
+    group = f"({', '.join('?' * len(columns))})"
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([group] * rows)}"
+    )
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_apple_datetime(date_str: str) -> datetime:
+    """Parse an Apple Health datetime string into Europe/Zurich time.
+
+    Exports repeat the same timestamps across many elements, so results are
+    cached on the raw string; datetimes are immutable and safe to share.
+    """
+    # Apple Health standard format: "2023-12-31 23:59:59 +0000", which
+    # fromisoformat parses in C, many times faster than strptime
+    return datetime.fromisoformat(date_str).astimezone(_ZURICH)
+
+
+def _maybe_datetime(value: str | None) -> datetime | None:
+    """Parse an optional datetime attribute value."""
+    return _parse_apple_datetime(value) if value else None
+
+
+def _maybe_bool(value: str | None) -> bool | None:
+    """Convert an optional "true"/"false" attribute value to bool."""
+    return value == "true" if value else None
+
+
+def _maybe_float(value: str | None, _float: type[float] = float) -> float | None:
+    """Convert an optional attribute value to float."""
+    return _float(value) if value else None
+
+
+def _maybe_int(value: str | None, _int: type[int] = int) -> int | None:
+    """Convert an optional attribute value to int."""
+    return _int(value) if value else None
+
+
+class _BloomFilter:
+    """Bit-array Bloom filter over 64-bit keys, answering "new" or "maybe present"."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int) -> Iterator[int]:
+        """Derive the bit positions of a key from its two 32-bit halves."""
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) & 0xFFFFFFFF | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: int) -> None:
+        """Set the bits of a key."""
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
 
 class AppleHealthParser:
     """Parser for Apple Health export XML files with streaming support."""
 
-    def __init__(self, db_path: str = "data/sqlite.db", bulk_mode: bool = True, data_cutoff: timedelta = timedelta(days=180)):
+    def __init__(
+        self,
+        db_path: str = "data/sqlite.db",
+        bulk_mode: bool = True,
+        data_cutoff: timedelta = timedelta(days=180),
+        engine: Engine | None = None,
+    ):
         """Initialize parser with database connection.
-        
+
         Args:
             db_path: Path to SQLite database
             bulk_mode: Enable bulk processing for better performance
             data_cutoff: Only process records newer than this timedelta (default: 6 months)
+            engine: Existing SQLite engine to use instead of opening db_path
         """
-        # Create data directory if it doesn't exist
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        if engine is None:
+            # Create data directory if it doesn't exist
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
-        # Create database engine
-        self.engine = create_engine(f"sqlite:///{db_path}")
+            # Create database engine
+            engine = create_engine(f"sqlite:///{db_path}")
+        self.engine = engine
         SQLModel.metadata.create_all(self.engine)
 
         # Add performance indexes
         self._create_indexes()
+        self._prepare_duplicate_queries()
 
         # Batch processing settings
         self.bulk_mode = bulk_mode
         self.batch_size = 5000 if bulk_mode else 1000
-        self.transaction_batch_size = 100  # Commit every N entities
-        self.current_batch: list[Any] = []
-        self.pending_commits = 0
+
+        # XML events are handed over from the parsing thread in chunks
+        self.event_chunk_size = 1000
+        self.event_queue_size = 64
+
+        # Existing record keys are read in batches of this many rows
+        self.key_fetch_size = 50_000
 
         # Data filtering settings
         self.data_cutoff = data_cutoff
-        self.cutoff_date = datetime.now(ZoneInfo("Europe/Zurich")) - data_cutoff
-
-        # Bulk processing collections
-        self.records_batch: list[Record] = []
-        self.workouts_batch: list[Workout] = []
-        self.correlations_batch: list[Correlation] = []
-        self.metadata_batch: list[MetadataEntry] = []
+        self.cutoff_date = datetime.now(_ZURICH) - data_cutoff
+
+        # Record keys seen so far, built per parse to skip most duplicate queries
+        self.record_filter: _BloomFilter | None = None
+
+        # New rows are buffered as plain mappings, per table model
+        self.row_batches: dict[type[SQLModel], list[dict[str, Any]]] = {}
+
+        # Element currently being processed, per tag
+        self._reset_parse_state()
+
+        # Handlers for element start events, dispatched by tag
+        self._start_handlers: dict[str, Callable[[Session, Any], None]] = {
+            "HealthData": self._handle_health_data,
+            "ExportDate": self._handle_export_date,
+            "Me": self._handle_me,
+            "Record": self._handle_record,
+            "Correlation": self._handle_correlation,
+            "Workout": self._handle_workout,
+            "ActivitySummary": self._handle_activity_summary,
+            "ClinicalRecord": self._handle_clinical_record,
+            "Audiogram": self._handle_audiogram,
+            "VisionPrescription": self._handle_vision_prescription,
+            "MetadataEntry": self._handle_metadata_entry,
+            "HeartRateVariabilityMetadataList": self._handle_hrv_list,
+            "WorkoutEvent": self._handle_workout_event,
+            "WorkoutStatistics": self._handle_workout_statistics,
+            "WorkoutRoute": self._handle_workout_route,
+            "SensitivityPoint": self._handle_sensitivity_point,
+            "Prescription": self._handle_eye_prescription,
+            "Attachment": self._handle_vision_attachment,
+            "InstantaneousBeatsPerMinute": self._handle_instantaneous_bpm,
+        }
 
-        # Maps for deferred ID resolution
-        self.record_temp_ids: dict[str, int] = {}  # temp_id -> actual_id
-        self.workout_temp_ids: dict[str, int] = {}
-        self.correlation_temp_ids: dict[str, int] = {}
-        self.temp_id_counter = 0
+        # Handlers for element end events, only queued for these tags
+        self._end_handlers: dict[str, Callable[[], None]] = {
+            "Correlation": self._end_correlation,
+            "Workout": self._end_workout,
+            "Audiogram": self._end_audiogram,
+            "VisionPrescription": self._end_vision_prescription,
+            "Record": self._end_record,
+            "HeartRateVariabilityMetadataList": self._end_hrv_list,
+        }
 
         self.stats = {
             "records": 0,
@@ -91,6 +234,27 @@ class AppleHealthParser:
             "filtered_old": 0,
         }
 
+    def _reset_parse_state(self) -> None:
+        """Reset the elements currently being processed."""
+        self.health_data: HealthData | None = None
+        self.current_correlation_id: int | None = None
+        self.current_workout_id: int | None = None
+        self.current_audiogram_id: int | None = None
+        self.current_vision_prescription_id: int | None = None
+        self.current_record_id: int | None = None
+        self.current_record_start: datetime | None = None
+        self.current_hrv_list_id: int | None = None
+
+        # Track parent elements for metadata
+        self.current_parent_type: str | None = None
+        self.current_parent_id: int | None = None
+
+        # Placeholder export date until the ExportDate element is seen
+        self.parse_started_at = datetime.now(_ZURICH)
+
+        # New records are inserted in batches, so their ids are assigned here
+        self.next_record_id = 1
+
     def parse_file(self, xml_path: str) -> None:
         """Parse Apple Health export XML file using streaming."""
         print(f"Starting to parse: {xml_path}")
@@ -103,643 +267,667 @@ class AppleHealthParser:
         file_size = os.path.getsize(xml_path)
         print(f"File size: {file_size / (1024**3):.2f} GB")
 
-        # Clear events to free memory during parsing
-        context = etree.iterparse(
-            xml_path,
-            events=("start", "end"),
-            tag=None,  # Process all tags
-            huge_tree=True,  # Enable parsing of large files
-        )
-
-        # Make iterator return start-end event pairs
-        context = iter(context)
-
-        # Skip to root element
-        event, root = next(context)
+        # Reset the state of elements currently being processed
+        self._reset_parse_state()
 
-        # Current element being processed
-        health_data: HealthData | None = None
-        current_correlation: Correlation | None = None
-        current_workout: Workout | None = None
-        current_audiogram: Audiogram | None = None
-        current_vision_prescription: VisionPrescription | None = None
-        current_record: Record | None = None
-        current_hrv_list: HeartRateVariabilityMetadataList | None = None
+        # Create progress bar
+        pbar = tqdm(desc="Processing", unit=" elements", miniters=1000)
 
-        # Track parent elements for metadata
-        current_parent_type: str | None = None
-        current_parent_id: int | None = None
+        # Tokenize the XML in a background thread while this thread handles
+        # the elements and writes them to the database
+        events: queue.Queue[_EventChunk | BaseException | None] = queue.Queue(
+            maxsize=self.event_queue_size
+        )
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce_events,
+            args=(
+                xml_path,
+                events,
+                stop,
+                frozenset(self._start_handlers),
+                frozenset(self._end_handlers),
+            ),
+            name="xml-producer",
+            daemon=True,
+        )
 
-        with Session(self.engine) as session:
-            try:
-                # Process root element first
-                if root.tag == "HealthData":
-                    # Check if HealthData already exists
-                    existing_health_data = session.exec(select(HealthData)).first()
-                    if existing_health_data:
-                        health_data = existing_health_data
-                        print(
-                            f"Using existing HealthData record with ID: {health_data.id}"
-                        )
-                    else:
-                        health_data = self._parse_health_data(root)
-                        session.add(health_data)
-                        session.commit()
-                        print(f"Created HealthData record with ID: {health_data.id}")
-
-                # Create progress bar
-                pbar = tqdm(desc="Processing", unit=" elements", miniters=1000)
-
-                for event, elem in context:
-                    if event == "start":
-                        # Update progress bar
-                        pbar.update(1)
-
-                        # Update description with current stats every 5000 records
-                        total_processed = (
-                            self.stats["records"] + self.stats["duplicates"] + self.stats["filtered_old"]
+        initial_import = False
+        try:
+            with (
+                self.engine.connect() as connection,
+                self._fast_import_pragmas(connection),
+                Session(connection) as session,
+            ):
+                existing_records = session.exec(
+                    select(func.count()).select_from(Record)
+                ).one()
+
+                # On an initial import the record filter answers nearly every
+                # duplicate check, so the record index is only built after loading,
+                # as are the indexes of tables nothing reads during the import
+                initial_import = existing_records == 0
+                if initial_import:
+                    session.execute(text("DROP INDEX IF EXISTS idx_record_duplicate"))
+                    session.execute(text("DROP INDEX IF EXISTS idx_metadata_parent"))
+                    for index in _DEFERRED_INDEXES:
+                        session.execute(DropIndex(index, if_exists=True))
+
+                self.record_filter = self._build_record_filter(
+                    session, existing_records, file_size
+                )
+                self.next_record_id = (
+                    session.exec(select(func.max(Record.id))).one() or 0
+                ) + 1
+                producer.start()
+                try:
+                    while (chunk := events.get()) is not None:
+                        if isinstance(chunk, BaseException):
+                            raise chunk
+
+                        elements = 0
+                        for tag, attrs in chunk:
+                            if attrs is None:
+                                self._end_handlers[tag]()
+                            else:
+                                elements += 1
+                                self._on_start(session, tag, attrs)
+
+                        # Report progress once per chunk rather than per element
+                        pbar.set_description(
+                            f"Records: {self.stats['records']:,} | "
+                            f"Duplicates: {self.stats['duplicates']:,} | "
+                            f"Filtered: {self.stats['filtered_old']:,} | "
+                            f"Errors: {self.stats['errors']:,}",
+                            refresh=False,
                         )
-                        if total_processed % 5000 == 0 and total_processed > 0:
-                            pbar.set_description(
-                                f"Records: {self.stats['records']:,} | "
-                                f"Duplicates: {self.stats['duplicates']:,} | "
-                                f"Filtered: {self.stats['filtered_old']:,} | "
-                                f"Errors: {self.stats['errors']:,}"
-                            )
-
-                        try:
-                            if elem.tag == "HealthData" and not health_data:
-                                # Check if HealthData already exists
-                                existing_health_data = session.exec(
-                                    select(HealthData)
-                                ).first()
-                                if existing_health_data:
-                                    health_data = existing_health_data
-                                else:
-                                    health_data = self._parse_health_data(elem)
-                                    session.add(health_data)
-                                    session.commit()
-
-                            elif elem.tag == "ExportDate" and health_data:
-                                # Update health_data with export date
-                                export_date_str = elem.get("value")
-                                if export_date_str:
-                                    health_data.export_date = self._parse_datetime(
-                                        export_date_str
-                                    )
-                                    session.add(health_data)
-                                    session.commit()
-
-                            elif elem.tag == "Me" and health_data:
-                                # Update health_data with personal info
-                                health_data.date_of_birth = elem.get(
-                                    "HKCharacteristicTypeIdentifierDateOfBirth", ""
-                                )
-                                health_data.biological_sex = elem.get(
-                                    "HKCharacteristicTypeIdentifierBiologicalSex", ""
-                                )
-                                health_data.blood_type = elem.get(
-                                    "HKCharacteristicTypeIdentifierBloodType", ""
-                                )
-                                health_data.fitzpatrick_skin_type = elem.get(
-                                    "HKCharacteristicTypeIdentifierFitzpatrickSkinType",
-                                    "",
-                                )
-                                health_data.cardio_fitness_medications_use = elem.get(
-                                    "HKCharacteristicTypeIdentifierCardioFitnessMedicationsUse",
-                                    "",
-                                )
-                                session.add(health_data)
-                                session.commit()
-
-                            elif (
-                                elem.tag == "Record" and health_data and health_data.id
-                            ):
-                                record = self._parse_record(elem, health_data.id)
-
-                                # Filter by cutoff date
-                                if record.start_date < self.cutoff_date:
-                                    self.stats["filtered_old"] += 1
-                                    continue
-
-                                # Check if inside a correlation - always use individual processing
-                                if current_correlation and current_correlation.id:
-                                    existing = self._check_duplicate_record(
-                                        session, record
-                                    )
-                                    if existing:
-                                        self.stats["duplicates"] += 1
-                                        record = existing
-                                    else:
-                                        session.add(record)
-                                        session.commit()
-
-                                    if record.id:
-                                        existing_link = (
-                                            self._check_duplicate_correlation_record(
-                                                session,
-                                                current_correlation.id,
-                                                record.id,
-                                            )
-                                        )
-                                        if not existing_link:
-                                            link = CorrelationRecord(
-                                                correlation_id=current_correlation.id,
-                                                record_id=record.id,
-                                            )
-                                            self._add_to_batch(session, link)
-                                            self.stats["correlation_records"] += 1
-                                else:
-                                    # Regular records - check for duplicate and use batched commits
-                                    existing = self._check_duplicate_record(
-                                        session, record
-                                    )
-                                    if existing:
-                                        self.stats["duplicates"] += 1
-                                        current_record = existing
-                                        current_parent_type = "record"
-                                        current_parent_id = existing.id
-                                    else:
-                                        session.add(record)
-                                        self.pending_commits += 1
-                                        current_record = record
-                                        current_parent_type = "record"
-                                        # Defer commit for batching
-                                        if (
-                                            self.pending_commits
-                                            >= self.transaction_batch_size
-                                        ):
-                                            session.commit()
-                                            self.pending_commits = 0
-                                        else:
-                                            session.flush()  # Get ID without committing
-                                        current_parent_id = record.id
-                                        self.stats["records"] += 1
-
-                            elif (
-                                elem.tag == "Correlation"
-                                and health_data
-                                and health_data.id
-                            ):
-                                correlation = self._parse_correlation(
-                                    elem, health_data.id
-                                )
-
-                                # Filter by cutoff date
-                                if correlation.start_date < self.cutoff_date:
-                                    self.stats["filtered_old"] += 1
-                                    continue
-
-                                # Check for duplicate
-                                existing = self._check_duplicate_correlation(
-                                    session, correlation
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                    current_correlation = existing
-                                else:
-                                    session.add(correlation)
-                                    self.pending_commits += 1
-                                    current_correlation = correlation
-                                    # Defer commit for batching
-                                    if (
-                                        self.pending_commits
-                                        >= self.transaction_batch_size
-                                    ):
-                                        session.commit()
-                                        self.pending_commits = 0
-                                    else:
-                                        session.flush()  # Get ID without committing
-                                    self.stats["correlations"] += 1
-
-                                current_parent_type = "correlation"
-                                current_parent_id = current_correlation.id
-
-                            elif (
-                                elem.tag == "Workout" and health_data and health_data.id
-                            ):
-                                workout = self._parse_workout(elem, health_data.id)
-
-                                # Filter by cutoff date
-                                if workout.start_date < self.cutoff_date:
-                                    self.stats["filtered_old"] += 1
-                                    continue
-
-                                # Check for duplicate
-                                existing = self._check_duplicate_workout(
-                                    session, workout
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                    current_workout = existing
-                                else:
-                                    session.add(workout)
-                                    self.pending_commits += 1
-                                    current_workout = workout
-                                    # Defer commit for batching
-                                    if (
-                                        self.pending_commits
-                                        >= self.transaction_batch_size
-                                    ):
-                                        session.commit()
-                                        self.pending_commits = 0
-                                    else:
-                                        session.flush()  # Get ID without committing
-                                    self.stats["workouts"] += 1
-
-                                current_parent_type = "workout"
-                                current_parent_id = current_workout.id
-
-                            elif (
-                                elem.tag == "ActivitySummary"
-                                and health_data
-                                and health_data.id
-                            ):
-                                summary = self._parse_activity_summary(
-                                    elem, health_data.id
-                                )
-
-                                # Check for duplicate
-                                existing = self._check_duplicate_activity_summary(
-                                    session, summary
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                else:
-                                    self._add_to_batch(session, summary)
-                                    self.stats["activity_summaries"] += 1
-
-                            elif (
-                                elem.tag == "ClinicalRecord"
-                                and health_data
-                                and health_data.id
-                            ):
-                                clinical = self._parse_clinical_record(
-                                    elem, health_data.id
-                                )
-
-                                # Check for duplicate
-                                existing = self._check_duplicate_clinical_record(
-                                    session, clinical
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                else:
-                                    self._add_to_batch(session, clinical)
-                                    self.stats["clinical_records"] += 1
-
-                            elif (
-                                elem.tag == "Audiogram"
-                                and health_data
-                                and health_data.id
-                            ):
-                                audiogram = self._parse_audiogram(elem, health_data.id)
-
-                                # Filter by cutoff date
-                                if audiogram.start_date < self.cutoff_date:
-                                    self.stats["filtered_old"] += 1
-                                    continue
-
-                                # Check for duplicate
-                                existing = self._check_duplicate_audiogram(
-                                    session, audiogram
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                    current_audiogram = existing
-                                else:
-                                    session.add(audiogram)
-                                    session.commit()
-                                    current_audiogram = audiogram
-                                    self.stats["audiograms"] += 1
-
-                            elif (
-                                elem.tag == "VisionPrescription"
-                                and health_data
-                                and health_data.id
-                            ):
-                                prescription = self._parse_vision_prescription(
-                                    elem, health_data.id
-                                )
-
-                                # Check for duplicate
-                                existing = self._check_duplicate_vision_prescription(
-                                    session, prescription
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                    current_vision_prescription = existing
-                                else:
-                                    session.add(prescription)
-                                    session.commit()
-                                    current_vision_prescription = prescription
-                                    self.stats["vision_prescriptions"] += 1
-
-                            elif (
-                                elem.tag == "MetadataEntry"
-                                and current_parent_type
-                                and current_parent_id
-                            ):
-                                metadata = self._parse_metadata_entry(
-                                    elem, current_parent_type, current_parent_id
-                                )
-                                self._add_to_batch(session, metadata)
-                                self.stats["metadata_entries"] += 1
-
-                            elif (
-                                elem.tag == "HeartRateVariabilityMetadataList"
-                                and current_record
-                                and current_record.id
-                            ):
-                                # Check for existing HRV list
-                                existing_hrv = self._check_duplicate_hrv_list(
-                                    session, current_record.id
-                                )
-                                if existing_hrv:
-                                    current_hrv_list = existing_hrv
-                                    self.stats["duplicates"] += 1
-                                else:
-                                    current_hrv_list = self._parse_hrv_list(
-                                        current_record.id
-                                    )
-                                    session.add(current_hrv_list)
-                                    session.commit()  # Need ID for relationships
-                                    self.stats["hrv_lists"] += 1
-
-                            # Handle nested elements
-                            elif (
-                                elem.tag == "WorkoutEvent"
-                                and current_workout
-                                and current_workout.id
-                            ):
-                                event_obj = self._parse_workout_event(
-                                    elem, current_workout.id
-                                )
-                                self._add_to_batch(session, event_obj)
-
-                            elif (
-                                elem.tag == "WorkoutStatistics"
-                                and current_workout
-                                and current_workout.id
-                            ):
-                                stat = self._parse_workout_statistics(
-                                    elem, current_workout.id
-                                )
-                                self._add_to_batch(session, stat)
-
-                            elif (
-                                elem.tag == "WorkoutRoute"
-                                and current_workout
-                                and current_workout.id
-                            ):
-                                route = self._parse_workout_route(
-                                    elem, current_workout.id
-                                )
-
-                                # Check for duplicate WorkoutRoute
-                                existing = self._check_duplicate_workout_route(
-                                    session, route
-                                )
-                                if existing:
-                                    self.stats["duplicates"] += 1
-                                else:
-                                    session.add(route)
-                                    session.commit()  # Immediate commit due to unique constraint
-
-                            elif (
-                                elem.tag == "SensitivityPoint"
-                                and current_audiogram
-                                and current_audiogram.id
-                            ):
-                                point = self._parse_sensitivity_point(
-                                    elem, current_audiogram.id
-                                )
-                                self._add_to_batch(session, point)
-
-                            elif (
-                                elem.tag == "Prescription"
-                                and current_vision_prescription
-                                and current_vision_prescription.id
-                            ):
-                                prescription = self._parse_eye_prescription(
-                                    elem, current_vision_prescription.id
-                                )
-                                self._add_to_batch(session, prescription)
-
-                            elif (
-                                elem.tag == "Attachment"
-                                and current_vision_prescription
-                                and current_vision_prescription.id
-                            ):
-                                attachment = self._parse_vision_attachment(
-                                    elem, current_vision_prescription.id
-                                )
-                                self._add_to_batch(session, attachment)
-
-                            elif (
-                                elem.tag == "InstantaneousBeatsPerMinute"
-                                and current_hrv_list
-                                and current_hrv_list.id
-                            ):
-                                bpm = self._parse_instantaneous_bpm(
-                                    elem, current_hrv_list.id, current_record.start_date if current_record else None
-                                )
-                                self._add_to_batch(session, bpm)
-
-                        except Exception as e:
-                            self.stats["errors"] += 1
-                            if self.stats["errors"] <= 10:  # Only print first 10 errors
-                                print(f"Error parsing {elem.tag}: {e}")
-
-                    elif event == "end":
-                        # Clear completed elements
-                        if elem.tag == "Correlation":
-                            current_correlation = None
-                            current_parent_type = None
-                            current_parent_id = None
-                        elif elem.tag == "Workout":
-                            current_workout = None
-                            current_parent_type = None
-                            current_parent_id = None
-                        elif elem.tag == "Audiogram":
-                            current_audiogram = None
-                        elif elem.tag == "VisionPrescription":
-                            current_vision_prescription = None
-                        elif elem.tag == "Record" and not current_correlation:
-                            current_record = None
-                            current_parent_type = None
-                            current_parent_id = None
-                        elif elem.tag == "HeartRateVariabilityMetadataList":
-                            current_hrv_list = None
-
-                        # Clear the element to free memory
-                        elem.clear()
-                        # Also remove preceding siblings
-                        while elem.getprevious() is not None:
-                            del elem.getparent()[0]
-
-                # Final commit for any pending transactions
-                if self.pending_commits > 0:
-                    session.commit()
-                    self.pending_commits = 0
+                        pbar.update(elements)
 
-                # Flush any remaining batches
-                self._flush_all_batches(session)
-                pbar.close()
+                    # Flush any remaining batches and commit the whole import
+                    self._flush_all_batches(session)
+                    session.commit()
 
-            except Exception as e:
-                pbar.close()
-                print(f"Fatal error during parsing: {e}")
-                raise
+                except Exception as e:
+                    print(f"Fatal error during parsing: {e}")
+                    raise
+
+                finally:
+                    stop.set()
+                    producer.join()
+                    pbar.close()
+                    self.record_filter = None
+        finally:
+            # Indexes dropped for an initial import are rebuilt even when it
+            # failed, since queries rely on them until the next import
+            if initial_import:
+                self._create_indexes()
+
+        # Refresh the query planner statistics for the tables just loaded
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA optimize")
 
         # Final statistics
         self._print_progress()
         print(f"Parsing complete! Data cutoff: {self.cutoff_date.isoformat()}")
 
-    def _add_to_batch(self, session: Session, obj: Any) -> None:
-        """Add object to batch and flush if necessary."""
-        self.current_batch.append(obj)
-        if len(self.current_batch) >= self.batch_size:
-            self._flush_batch(session)
-
-    def _flush_batch(self, session: Session) -> None:
-        """Flush current batch to database."""
-        if self.current_batch:
-            session.add_all(self.current_batch)
-            session.commit()
-            self.current_batch = []
+    @contextmanager
+    def _fast_import_pragmas(self, connection: Connection) -> Iterator[None]:
+        """Tune the import connection for bulk writes, restoring it afterwards.
 
-    def _create_indexes(self) -> None:
-        """Create database indexes for performance."""
-        from sqlalchemy import text
+        A large page cache and memory-mapped reads serve the duplicate checks
+        against the tables being written. In bulk mode durability is relaxed
+        as well: the rollback journal is kept in memory and writes are not
+        synced, so a crash during an import means running it again, which is
+        safe since rows already stored are skipped as duplicates.
+        """
+        pragmas = {
+            "temp_store": "MEMORY",
+            "cache_size": "-2000000",  # In KiB, about 2 GB
+            "mmap_size": "30000000000",
+        }
+        if self.bulk_mode:
+            pragmas["journal_mode"] = "MEMORY"
+            pragmas["synchronous"] = "OFF"
+        previous = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in pragmas
+        }
+        for name, value in pragmas.items():
+            connection.exec_driver_sql(f"PRAGMA {name}={value}")
+        connection.commit()
+        try:
+            yield
+        finally:
+            for name, setting in previous.items():
+                connection.exec_driver_sql(f"PRAGMA {name}={setting}")
+            connection.commit()
+
+    def _produce_events(
+        self,
+        xml_path: str,
+        events: queue.Queue[_EventChunk | BaseException | None],
+        stop: threading.Event,
+        start_tags: frozenset[str],
+        end_tags: frozenset[str],
+    ) -> None:
+        """Parse the XML file, queueing element events in chunks.
+
+        Start events carry the element attributes, end events carry None.
+        Only events of start_tags and end_tags are queued, so elements
+        without a handler never reach the database thread. The stream ends
+        with None, or with the exception that stopped it.
+        """
+        chunk: _EventChunk = []
 
-        with Session(self.engine) as session:
-            # Indexes for duplicate checking
-            indexes = [
-                "CREATE INDEX IF NOT EXISTS idx_record_duplicate ON record (type, start_date, end_date, health_data_id, value)",
-                "CREATE INDEX IF NOT EXISTS idx_workout_duplicate ON workout (workout_activity_type, start_date, end_date, health_data_id)",
-                "CREATE INDEX IF NOT EXISTS idx_correlation_duplicate ON correlation (type, start_date, end_date, health_data_id)",
-                "CREATE INDEX IF NOT EXISTS idx_activity_summary_duplicate ON activitysummary (date_components, health_data_id)",
-                "CREATE INDEX IF NOT EXISTS idx_clinical_record_duplicate ON clinicalrecord (identifier, health_data_id)",
-                "CREATE INDEX IF NOT EXISTS idx_audiogram_duplicate ON audiogram (type, start_date, end_date, health_data_id)",
-                "CREATE INDEX IF NOT EXISTS idx_vision_prescription_duplicate ON visionprescription (type, date_issued, health_data_id)",
-                "CREATE INDEX IF NOT EXISTS idx_correlation_record_duplicate ON correlationrecord (correlation_id, record_id)",
-            ]
-            for index_sql in indexes:
+        def put(item: _EventChunk | BaseException | None) -> None:
+            # Give up once the consumer stopped reading the queue
+            while not stop.is_set():
                 try:
-                    session.execute(text(index_sql))
-                except Exception as e:
-                    print(f"Index creation warning: {e}")
-            session.commit()
+                    events.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            raise RuntimeError("XML parsing cancelled")
+
+        def start(tag: str, attrs: dict[str, str]) -> None:
+            nonlocal chunk
+            if tag not in start_tags:
+                return
+            chunk.append((tag, attrs))
+            if len(chunk) >= self.event_chunk_size:
+                # Hand the list itself over, a new one collects the next events
+                put(chunk)
+                chunk = []
+
+        def end(tag: str) -> None:
+            if tag in end_tags:
+                chunk.append((tag, None))
+
+        # Stream element events through parser callbacks: with a parser
+        # target lxml never builds elements, so there is no tree to clear
+        target = SimpleNamespace(start=start, end=end, close=lambda: None)
+        xml_parser = etree.XMLParser(
+            target=target,
+            huge_tree=True,  # Enable parsing of large files
+        )
+
+        try:
+            etree.parse(xml_path, xml_parser)
+            put(chunk)
+            put(None)
+        except BaseException as e:  # noqa: BLE001 - forwarded to the consumer
+            # Anything that stops the parsing ends the stream, so the consumer
+            # never waits for events that will not come; nothing is handed
+            # over once the consumer stopped reading
+            with suppress(RuntimeError):
+                put(e)
+
+    def _on_start(self, session: Session, tag: str, attrs: dict[str, str]) -> None:
+        """Dispatch an element start event to its handler."""
+        handler = self._start_handlers.get(tag)
+        if handler is None:
+            return
 
-    def _bulk_insert_records(self, session: Session) -> None:
-        """Bulk insert records with batch duplicate checking."""
-        if not self.records_batch:
+        try:
+            handler(session, attrs)
+        except Exception as e:
+            self.stats["errors"] += 1
+            if self.stats["errors"] <= 10:  # Only print first 10 errors
+                print(f"Error parsing {tag}: {e}")
+
+    # Element end handlers, dispatched by tag from parse_file
+    def _end_correlation(self) -> None:
+        """Clear the completed correlation."""
+        self.current_correlation_id = None
+        self.current_parent_type = None
+        self.current_parent_id = None
+
+    def _end_workout(self) -> None:
+        """Clear the completed workout."""
+        self.current_workout_id = None
+        self.current_parent_type = None
+        self.current_parent_id = None
+
+    def _end_audiogram(self) -> None:
+        """Clear the completed audiogram."""
+        self.current_audiogram_id = None
+
+    def _end_vision_prescription(self) -> None:
+        """Clear the completed vision prescription."""
+        self.current_vision_prescription_id = None
+
+    def _end_record(self) -> None:
+        """Clear the completed record."""
+        # Records of a correlation never became the metadata parent
+        if not self.current_correlation_id:
+            self.current_record_id = None
+            self.current_record_start = None
+            self.current_parent_type = None
+            self.current_parent_id = None
+
+    def _end_hrv_list(self) -> None:
+        """Clear the completed HRV list."""
+        self.current_hrv_list_id = None
+
+    # Element handlers, dispatched by tag from parse_file
+    def _handle_health_data(self, session: Session, attrs: Any) -> None:
+        """Handle HealthData element, reusing an existing record if present."""
+        if self.health_data:
             return
 
-        # Group records by type for efficient duplicate checking
-        records_by_type: dict[tuple[str | None, int], list[Record]] = {}
-        for record in self.records_batch:
-            key = (record.type, record.health_data_id or 0)
-            if key not in records_by_type:
-                records_by_type[key] = []
-            records_by_type[key].append(record)
-
-        new_records = []
-        for (record_type, health_data_id), type_records in records_by_type.items():
-            # Batch check for existing records of this type
-            start_dates = [r.start_date for r in type_records]
-            end_dates = [r.end_date for r in type_records]
-
-            # Build query conditions
-            stmt = select(Record).where(
-                Record.type == record_type,
-                Record.health_data_id == health_data_id,
+        existing_health_data = session.exec(select(HealthData)).first()
+        if existing_health_data:
+            self.health_data = existing_health_data
+            print(
+                f"Using existing HealthData record with ID: {existing_health_data.id}"
             )
+        else:
+            health_data = self._parse_health_data(attrs)
+            session.add(health_data)
+            session.flush()
+            self.health_data = health_data
+            print(f"Created HealthData record with ID: {health_data.id}")
+
+    def _handle_export_date(self, session: Session, attrs: Any) -> None:
+        """Update health_data with export date."""
+        if not self.health_data:
+            return
 
-            if start_dates:
-                from sqlalchemy import or_
+        export_date_str = attrs.get("value")
+        if export_date_str:
+            self.health_data.export_date = _parse_apple_datetime(export_date_str)
+            session.add(self.health_data)
+            session.flush()
 
-                date_conditions = []
-                for i, (start_date, end_date) in enumerate(zip(start_dates, end_dates)):
-                    date_conditions.append(
-                        (Record.start_date == start_date)
-                        & (Record.end_date == end_date)
-                    )
-                if date_conditions:
-                    stmt = stmt.where(or_(*date_conditions))
-
-            existing_records = session.exec(stmt).all()
-
-            # Create lookup set for existing records
-            existing_set: set[tuple[datetime, datetime, str | None]] = set()
-            for existing in existing_records:
-                lookup_key = (existing.start_date, existing.end_date, existing.value)
-                existing_set.add(lookup_key)
-
-            # Filter out duplicates
-            for record in type_records:
-                record_key = (record.start_date, record.end_date, record.value)
-                if record_key in existing_set:
-                    self.stats["duplicates"] += 1
-                else:
-                    new_records.append(record)
-
-        if new_records:
-            session.add_all(new_records)
-            session.commit()
-            self.stats["records"] += len(new_records)
+    def _handle_me(self, session: Session, attrs: Any) -> None:
+        """Update health_data with personal info."""
+        health_data = self.health_data
+        if not health_data:
+            return
 
-        self.records_batch = []
+        health_data.date_of_birth = attrs.get(
+            "HKCharacteristicTypeIdentifierDateOfBirth", ""
+        )
+        health_data.biological_sex = attrs.get(
+            "HKCharacteristicTypeIdentifierBiologicalSex", ""
+        )
+        health_data.blood_type = attrs.get(
+            "HKCharacteristicTypeIdentifierBloodType", ""
+        )
+        health_data.fitzpatrick_skin_type = attrs.get(
+            "HKCharacteristicTypeIdentifierFitzpatrickSkinType", ""
+        )
+        health_data.cardio_fitness_medications_use = attrs.get(
+            "HKCharacteristicTypeIdentifierCardioFitnessMedicationsUse", ""
+        )
+        session.add(health_data)
+        session.flush()
+
+    def _handle_record(self, session: Session, attrs: Any) -> None:
+        """Handle Record element, linking it to the enclosing correlation if any."""
+        if not (self.health_data and self.health_data.id):
+            return
+
+        record = self._parse_record(attrs, self.health_data.id)
 
-    def _bulk_insert_workouts(self, session: Session) -> None:
-        """Bulk insert workouts with duplicate checking."""
-        if not self.workouts_batch:
+        # Filter by cutoff date
+        if record["start_date"] < self.cutoff_date:
+            self.stats["filtered_old"] += 1
             return
 
-        new_workouts = []
-        for workout in self.workouts_batch:
-            existing = self._check_duplicate_workout(session, workout)
+        # Check if inside a correlation - always use individual processing
+        current_correlation_id = self.current_correlation_id
+        if current_correlation_id:
+            existing = self._check_duplicate_record(session, record)
             if existing:
                 self.stats["duplicates"] += 1
+                record_id = existing.id
             else:
-                new_workouts.append(workout)
+                record_id = self._insert_record(session, record)
+
+            if record_id:
+                existing_link = self._check_duplicate_correlation_record(
+                    session, current_correlation_id, record_id
+                )
+                if not existing_link:
+                    link = {
+                        "correlation_id": current_correlation_id,
+                        "record_id": record_id,
+                    }
+                    self._add_row(session, CorrelationRecord, link)
+                    self.stats["correlation_records"] += 1
+            return
 
-        if new_workouts:
-            session.add_all(new_workouts)
-            session.commit()
-            self.stats["workouts"] += len(new_workouts)
+        # Regular records - check for duplicate and queue new ones
+        existing = self._check_duplicate_record(session, record)
+        if existing:
+            self.stats["duplicates"] += 1
+            self.current_record_id = existing.id
+            self.current_record_start = existing.start_date
+        else:
+            self.current_record_id = self._insert_record(session, record)
+            self.current_record_start = record["start_date"]
+            self.stats["records"] += 1
+
+        self.current_parent_type = "record"
+        self.current_parent_id = self.current_record_id
+
+    def _insert_record(self, session: Session, record: dict[str, Any]) -> int:
+        """Queue a new record row under the next free id, returning the id."""
+        record_id = record["id"] = self.next_record_id
+        self.next_record_id += 1
+        self._add_row(session, Record, record)
+        return record_id
+
+    def _handle_correlation(self, session: Session, attrs: Any) -> None:
+        """Handle Correlation element."""
+        if not (self.health_data and self.health_data.id):
+            return
 
-        self.workouts_batch = []
+        correlation = self._parse_correlation(attrs, self.health_data.id)
 
-    def _bulk_insert_correlations(self, session: Session) -> None:
-        """Bulk insert correlations with duplicate checking."""
-        if not self.correlations_batch:
+        # Filter by cutoff date
+        if correlation["start_date"] < self.cutoff_date:
+            self.stats["filtered_old"] += 1
             return
 
-        new_correlations = []
-        for correlation in self.correlations_batch:
-            existing = self._check_duplicate_correlation(session, correlation)
-            if existing:
-                self.stats["duplicates"] += 1
-            else:
-                new_correlations.append(correlation)
+        # Check for duplicate
+        existing_id = self._check_duplicate_correlation(session, correlation)
+        if existing_id:
+            self.stats["duplicates"] += 1
+            self.current_correlation_id = existing_id
+        else:
+            # Records and metadata below need the new correlation's id
+            self.current_correlation_id = self._insert_returning_id(
+                session, Correlation, correlation
+            )
+            self.stats["correlations"] += 1
 
-        if new_correlations:
-            session.add_all(new_correlations)
-            session.commit()
-            self.stats["correlations"] += len(new_correlations)
+        self.current_parent_type = "correlation"
+        self.current_parent_id = self.current_correlation_id
+
+    def _handle_workout(self, session: Session, attrs: Any) -> None:
+        """Handle Workout element."""
+        if not (self.health_data and self.health_data.id):
+            return
+
+        workout = self._parse_workout(attrs, self.health_data.id)
+
+        # Filter by cutoff date
+        if workout["start_date"] < self.cutoff_date:
+            self.stats["filtered_old"] += 1
+            return
+
+        # Check for duplicate
+        existing_id = self._check_duplicate_workout(session, workout)
+        if existing_id:
+            self.stats["duplicates"] += 1
+            self.current_workout_id = existing_id
+        else:
+            # Children and metadata below need the new workout's id
+            self.current_workout_id = self._insert_returning_id(
+                session, Workout, workout
+            )
+            self.stats["workouts"] += 1
+
+        self.current_parent_type = "workout"
+        self.current_parent_id = self.current_workout_id
+
+    def _handle_activity_summary(self, session: Session, attrs: Any) -> None:
+        """Handle ActivitySummary element."""
+        if not (self.health_data and self.health_data.id):
+            return
+
+        summary = self._parse_activity_summary(attrs, self.health_data.id)
+
+        # Check for duplicate
+        if self._check_duplicate_activity_summary(session, summary):
+            self.stats["duplicates"] += 1
+        else:
+            self._add_row(session, ActivitySummary, summary)
+            self.stats["activity_summaries"] += 1
+
+    def _handle_clinical_record(self, session: Session, attrs: Any) -> None:
+        """Handle ClinicalRecord element."""
+        if not (self.health_data and self.health_data.id):
+            return
+
+        clinical = self._parse_clinical_record(attrs, self.health_data.id)
+
+        # Check for duplicate
+        if self._check_duplicate_clinical_record(session, clinical):
+            self.stats["duplicates"] += 1
+        else:
+            self._add_row(session, ClinicalRecord, clinical)
+            self.stats["clinical_records"] += 1
+
+    def _handle_audiogram(self, session: Session, attrs: Any) -> None:
+        """Handle Audiogram element."""
+        if not (self.health_data and self.health_data.id):
+            return
+
+        audiogram = self._parse_audiogram(attrs, self.health_data.id)
+
+        # Filter by cutoff date
+        if audiogram["start_date"] < self.cutoff_date:
+            self.stats["filtered_old"] += 1
+            return
+
+        # Check for duplicate
+        existing_id = self._check_duplicate_audiogram(session, audiogram)
+        if existing_id:
+            self.stats["duplicates"] += 1
+            self.current_audiogram_id = existing_id
+        else:
+            self.current_audiogram_id = self._insert_returning_id(
+                session, Audiogram, audiogram
+            )
+            self.stats["audiograms"] += 1
+
+    def _handle_vision_prescription(self, session: Session, attrs: Any) -> None:
+        """Handle VisionPrescription element."""
+        if not (self.health_data and self.health_data.id):
+            return
+
+        prescription = self._parse_vision_prescription(attrs, self.health_data.id)
+
+        # Check for duplicate
+        existing_id = self._check_duplicate_vision_prescription(session, prescription)
+        if existing_id:
+            self.stats["duplicates"] += 1
+            self.current_vision_prescription_id = existing_id
+        else:
+            self.current_vision_prescription_id = self._insert_returning_id(
+                session, VisionPrescription, prescription
+            )
+            self.stats["vision_prescriptions"] += 1
+
+    def _handle_metadata_entry(self, session: Session, attrs: Any) -> None:
+        """Handle MetadataEntry element of the current parent."""
+        if not (self.current_parent_type and self.current_parent_id):
+            return
+
+        metadata = self._parse_metadata_entry(
+            attrs, self.current_parent_type, self.current_parent_id
+        )
+        self._add_row(session, MetadataEntry, metadata)
+        self.stats["metadata_entries"] += 1
+
+    def _handle_hrv_list(self, session: Session, attrs: Any) -> None:
+        """Handle HeartRateVariabilityMetadataList element of the current record."""
+        if not self.current_record_id:
+            return
+
+        # Check for existing HRV list
+        existing_id = self._check_duplicate_hrv_list(session, self.current_record_id)
+        if existing_id:
+            self.current_hrv_list_id = existing_id
+            self.stats["duplicates"] += 1
+        else:
+            hrv_list = self._parse_hrv_list(self.current_record_id)
+            self.current_hrv_list_id = self._insert_returning_id(
+                session, HeartRateVariabilityMetadataList, hrv_list
+            )
+            self.stats["hrv_lists"] += 1
+
+    def _handle_workout_event(self, session: Session, attrs: Any) -> None:
+        """Handle WorkoutEvent element of the current workout."""
+        if self.current_workout_id:
+            event = self._parse_workout_event(attrs, self.current_workout_id)
+            self._add_row(session, WorkoutEvent, event)
+
+    def _handle_workout_statistics(self, session: Session, attrs: Any) -> None:
+        """Handle WorkoutStatistics element of the current workout."""
+        if self.current_workout_id:
+            stat = self._parse_workout_statistics(attrs, self.current_workout_id)
+            self._add_row(session, WorkoutStatistics, stat)
+
+    def _handle_workout_route(self, session: Session, attrs: Any) -> None:
+        """Handle WorkoutRoute element of the current workout."""
+        if not self.current_workout_id:
+            return
+
+        route = self._parse_workout_route(attrs, self.current_workout_id)
+
+        # Check for duplicate WorkoutRoute
+        if self._check_duplicate_workout_route(session, route):
+            self.stats["duplicates"] += 1
+        else:
+            session.add(route)
+            session.flush()  # Immediate flush due to unique constraint
+
+    def _handle_sensitivity_point(self, session: Session, attrs: Any) -> None:
+        """Handle SensitivityPoint element of the current audiogram."""
+        if self.current_audiogram_id:
+            point = self._parse_sensitivity_point(attrs, self.current_audiogram_id)
+            self._add_row(session, SensitivityPoint, point)
+
+    def _handle_eye_prescription(self, session: Session, attrs: Any) -> None:
+        """Handle Prescription element of the current vision prescription."""
+        if self.current_vision_prescription_id:
+            prescription = self._parse_eye_prescription(
+                attrs, self.current_vision_prescription_id
+            )
+            self._add_row(session, EyePrescription, prescription)
+
+    def _handle_vision_attachment(self, session: Session, attrs: Any) -> None:
+        """Handle Attachment element of the current vision prescription."""
+        if self.current_vision_prescription_id:
+            attachment = self._parse_vision_attachment(
+                attrs, self.current_vision_prescription_id
+            )
+            self._add_row(session, VisionAttachment, attachment)
+
+    def _handle_instantaneous_bpm(self, session: Session, attrs: Any) -> None:
+        """Handle InstantaneousBeatsPerMinute element of the current HRV list."""
+        if not self.current_hrv_list_id:
+            return
+
+        bpm = self._parse_instantaneous_bpm(
+            attrs, self.current_hrv_list_id, self.current_record_start
+        )
+        self._add_row(session, InstantaneousBeatsPerMinute, bpm)
+
+    def _insert_returning_id(
+        self, session: Session, model: type[SQLModel], row: dict[str, Any]
+    ) -> int:
+        """Insert a parent row right away, returning the id its children need."""
+        table = model.__table__  # type: ignore[attr-defined]
+        return session.execute(insert(table).returning(table.c.id), row).scalar_one()
+
+    def _add_row(
+        self, session: Session, model: type[SQLModel], row: dict[str, Any]
+    ) -> None:
+        """Buffer a new row and insert the model's rows once the batch is full."""
+        rows = self.row_batches.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self._flush_rows(session, model)
+
+    def _flush_rows(self, session: Session, model: type[SQLModel]) -> None:
+        """Insert buffered rows of one model with multi-row VALUES statements.
+
+        Values are converted with the column types' own bind processors, so
+        they are stored exactly as the ORM would store them.
+        """
+        rows = self.row_batches.get(model)
+        if not rows:
+            return
+
+        connection = session.connection()
+        table = model.__table__  # type: ignore[attr-defined]
+        columns = tuple(rows[0])
+        processors = [
+            table.c[name]
+            .type.dialect_impl(connection.dialect)
+            .bind_processor(connection.dialect)
+            for name in columns
+        ]
+        converted = [
+            (index, processor)
+            for index, processor in enumerate(processors)
+            if processor is not None
+        ]
+        row_values = operator.itemgetter(*columns)
+        quote = connection.dialect.identifier_preparer.quote
+        quoted_table = quote(table.name)
+        quoted_columns = tuple(quote(name) for name in columns)
+
+        # As many rows per statement as the bound parameter limit allows,
+        # which is set when SQLite is compiled and differs between builds
+        driver_connection = connection.connection.driver_connection
+        max_variables = driver_connection.getlimit(  # type: ignore[union-attr]
+            sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER
+        )
+        step = max_variables // len(columns)
+        for start in range(0, len(rows), step):
+            params: list[Any] = []
+            for row in rows[start : start + step]:
+                values = (
+                    list(row_values(row)) if len(columns) > 1 else [row_values(row)]
+                )
+                for index, processor in converted:
+                    if values[index] is not None:
+                        values[index] = processor(values[index])
+                params.extend(values)
+            sql = _multi_row_insert_sql(
+                quoted_table, quoted_columns, len(params) // len(columns)
+            )
+            connection.exec_driver_sql(sql, tuple(params))
+
+        self.row_batches[model] = []
+
+    def _create_indexes(self) -> None:
+        """Create database indexes for performance."""
+        with Session(self.engine) as session:
+            # Indexes for duplicate checking
+            indexes = [
+                "CREATE INDEX IF NOT EXISTS idx_record_duplicate ON record (type, start_date, end_date, health_data_id, value)",
+                "CREATE INDEX IF NOT EXISTS idx_workout_duplicate ON workout (workout_activity_type, start_date, end_date, health_data_id)",
+                "CREATE INDEX IF NOT EXISTS idx_correlation_duplicate ON correlation (type, start_date, end_date, health_data_id)",
+                "CREATE INDEX IF NOT EXISTS idx_activity_summary_duplicate ON activitysummary (date_components, health_data_id)",
+                "CREATE INDEX IF NOT EXISTS idx_clinical_record_duplicate ON clinicalrecord (identifier, health_data_id)",
+                "CREATE INDEX IF NOT EXISTS idx_audiogram_duplicate ON audiogram (type, start_date, end_date, health_data_id)",
+                "CREATE INDEX IF NOT EXISTS idx_vision_prescription_duplicate ON visionprescription (type, date_issued, health_data_id)",
+                "CREATE INDEX IF NOT EXISTS idx_correlation_record_duplicate ON correlationrecord (correlation_id, record_id)",
+                # Metadata is read per parent, by type and id together
+                "CREATE INDEX IF NOT EXISTS idx_metadata_parent ON metadataentry (parent_type, parent_id)",
+            ]
+            for index_sql in indexes:
+                try:
+                    session.execute(text(index_sql))
+                except Exception as e:
+                    print(f"Index creation warning: {e}")
 
-        self.correlations_batch = []
+            # Model indexes dropped for an initial import
+            for index in _DEFERRED_INDEXES:
+                session.execute(CreateIndex(index, if_not_exists=True))
+            session.commit()
 
     def _flush_all_batches(self, session: Session) -> None:
         """Flush all bulk batches to database."""
-        if self.bulk_mode:
-            self._bulk_insert_records(session)
-            self._bulk_insert_workouts(session)
-            self._bulk_insert_correlations(session)
-            session.commit()
-        self._flush_batch(session)  # Handle remaining objects
+        for model in self.row_batches:
+            self._flush_rows(session, model)
 
     def _print_progress(self) -> None:
         """Print current parsing progress."""
@@ -748,170 +936,335 @@ class AppleHealthParser:
             print(f"  {key}: {value:,}")
 
     # Duplicate checking methods
+    def _prepare_duplicate_queries(self) -> None:
+        """Build the duplicate-check statements once, bound per call."""
+        self._record_duplicate_query = select(Record).where(
+            Record.type == bindparam("type"),
+            Record.start_date == bindparam("start_date"),
+            Record.end_date == bindparam("end_date"),
+            Record.health_data_id == bindparam("health_data_id"),
+            Record.value == bindparam("value"),
+        )
+        self._record_without_value_duplicate_query = select(Record).where(
+            Record.type == bindparam("type"),
+            Record.start_date == bindparam("start_date"),
+            Record.end_date == bindparam("end_date"),
+            Record.health_data_id == bindparam("health_data_id"),
+            Record.value.is_(None),  # type: ignore[union-attr]
+        )
+
+        # Parent checks fetch the id of the first match for the children
+        self._workout_duplicate_query = (
+            select(Workout.id)
+            .where(
+                Workout.workout_activity_type == bindparam("workout_activity_type"),
+                Workout.start_date == bindparam("start_date"),
+                Workout.end_date == bindparam("end_date"),
+                Workout.health_data_id == bindparam("health_data_id"),
+            )
+            .limit(1)
+        )
+        self._correlation_duplicate_query = (
+            select(Correlation.id)
+            .where(
+                Correlation.type == bindparam("type"),
+                Correlation.start_date == bindparam("start_date"),
+                Correlation.end_date == bindparam("end_date"),
+                Correlation.health_data_id == bindparam("health_data_id"),
+            )
+            .limit(1)
+        )
+        self._audiogram_duplicate_query = (
+            select(Audiogram.id)
+            .where(
+                Audiogram.type == bindparam("type"),
+                Audiogram.start_date == bindparam("start_date"),
+                Audiogram.end_date == bindparam("end_date"),
+                Audiogram.health_data_id == bindparam("health_data_id"),
+            )
+            .limit(1)
+        )
+        self._vision_prescription_duplicate_query = (
+            select(VisionPrescription.id)
+            .where(
+                VisionPrescription.type == bindparam("type"),
+                VisionPrescription.date_issued == bindparam("date_issued"),
+                VisionPrescription.health_data_id == bindparam("health_data_id"),
+            )
+            .limit(1)
+        )
+        self._hrv_list_duplicate_query = (
+            select(HeartRateVariabilityMetadataList.id)
+            .where(HeartRateVariabilityMetadataList.record_id == bindparam("record_id"))
+            .limit(1)
+        )
+
+        # Existence checks only fetch a key column of the first match
+        self._activity_summary_duplicate_query = (
+            select(ActivitySummary.id)
+            .where(
+                ActivitySummary.date_components == bindparam("date_components"),
+                ActivitySummary.health_data_id == bindparam("health_data_id"),
+            )
+            .limit(1)
+        )
+        self._clinical_record_duplicate_query = (
+            select(ClinicalRecord.id)
+            .where(
+                ClinicalRecord.identifier == bindparam("identifier"),
+                ClinicalRecord.health_data_id == bindparam("health_data_id"),
+            )
+            .limit(1)
+        )
+        self._correlation_record_duplicate_query = (
+            select(CorrelationRecord.record_id)
+            .where(
+                CorrelationRecord.correlation_id == bindparam("correlation_id"),
+                CorrelationRecord.record_id == bindparam("record_id"),
+            )
+            .limit(1)
+        )
+        self._workout_route_duplicate_query = (
+            select(WorkoutRoute.id)
+            .where(WorkoutRoute.workout_id == bindparam("workout_id"))
+            .limit(1)
+        )
+
+    def _build_record_filter(
+        self, session: Session, existing: int, file_size: int
+    ) -> _BloomFilter:
+        """Build the record key filter, seeded with the records already stored."""
+        # Records make up most of an export, at roughly 300 bytes each
+        record_filter = _BloomFilter(existing + file_size // 300)
+        if not existing:
+            return record_filter
+
+        # Read plain tuples straight from the driver, in large batches, and
+        # convert only the stored dates
+        from_iso = datetime.fromisoformat
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.execute("SELECT type, start_date, end_date, value FROM record")
+            while rows := cursor.fetchmany(self.key_fetch_size):
+                for record_type, start_date, end_date, value in rows:
+                    record_filter.add(
+                        self._record_key(
+                            record_type, from_iso(start_date), from_iso(end_date), value
+                        )
+                    )
+        finally:
+            cursor.close()
+        return record_filter
+
+    @staticmethod
+    def _record_key(
+        record_type: str,
+        start_date: datetime,
+        end_date: datetime,
+        value: str | None,
+    ) -> int:
+        """Hash the duplicate-check columns of a record, dates as stored."""
+        return hash(
+            (
+                record_type,
+                start_date.replace(tzinfo=None),
+                end_date.replace(tzinfo=None),
+                value,
+            )
+        )
+
     def _check_duplicate_record(
-        self, session: Session, record: Record
+        self, session: Session, record: dict[str, Any]
     ) -> Record | None:
-        """Check if a record already exists."""
-        stmt = select(Record).where(
-            Record.type == record.type,
-            Record.start_date == record.start_date,
-            Record.end_date == record.end_date,
-            Record.health_data_id == record.health_data_id,
-        )
+        """Check if a record row already exists."""
+        # Keys the filter has never seen cannot be in the database
+        if self.record_filter is not None:
+            key = self._record_key(
+                record["type"],
+                record["start_date"],
+                record["end_date"],
+                record["value"],
+            )
+            if key not in self.record_filter:
+                self.record_filter.add(key)
+                return None
+
+        # Queued records must be stored before the database can confirm a match
+        self._flush_rows(session, Record)
+
+        params = {
+            "type": record["type"],
+            "start_date": record["start_date"],
+            "end_date": record["end_date"],
+            "health_data_id": record["health_data_id"],
+        }
 
         # Also check value if present
-        if record.value is not None:
-            stmt = stmt.where(Record.value == record.value)
-        else:
-            stmt = stmt.where(Record.value.is_(None))
-
-        return session.exec(stmt).first()
+        if record["value"] is not None:
+            params["value"] = record["value"]
+            return session.exec(self._record_duplicate_query, params=params).first()
+        return session.exec(
+            self._record_without_value_duplicate_query, params=params
+        ).first()
 
     def _check_duplicate_workout(
-        self, session: Session, workout: Workout
-    ) -> Workout | None:
-        """Check if a workout already exists."""
+        self, session: Session, workout: dict[str, Any]
+    ) -> int | None:
+        """Return the id of a matching workout, if one already exists."""
         return session.exec(
-            select(Workout).where(
-                Workout.workout_activity_type == workout.workout_activity_type,
-                Workout.start_date == workout.start_date,
-                Workout.end_date == workout.end_date,
-                Workout.health_data_id == workout.health_data_id,
-            )
+            self._workout_duplicate_query,
+            params={
+                "workout_activity_type": workout["workout_activity_type"],
+                "start_date": workout["start_date"],
+                "end_date": workout["end_date"],
+                "health_data_id": workout["health_data_id"],
+            },
         ).first()
 
     def _check_duplicate_correlation(
-        self, session: Session, correlation: Correlation
-    ) -> Correlation | None:
-        """Check if a correlation already exists."""
+        self, session: Session, correlation: dict[str, Any]
+    ) -> int | None:
+        """Return the id of a matching correlation, if one already exists."""
         return session.exec(
-            select(Correlation).where(
-                Correlation.type == correlation.type,
-                Correlation.start_date == correlation.start_date,
-                Correlation.end_date == correlation.end_date,
-                Correlation.health_data_id == correlation.health_data_id,
-            )
+            self._correlation_duplicate_query,
+            params={
+                "type": correlation["type"],
+                "start_date": correlation["start_date"],
+                "end_date": correlation["end_date"],
+                "health_data_id": correlation["health_data_id"],
+            },
         ).first()
 
     def _check_duplicate_activity_summary(
-        self, session: Session, summary: ActivitySummary
-    ) -> ActivitySummary | None:
+        self, session: Session, summary: dict[str, Any]
+    ) -> bool:
         """Check if an activity summary already exists."""
-        return session.exec(
-            select(ActivitySummary).where(
-                ActivitySummary.date_components == summary.date_components,
-                ActivitySummary.health_data_id == summary.health_data_id,
-            )
-        ).first()
+        return (
+            session.exec(
+                self._activity_summary_duplicate_query,
+                params={
+                    "date_components": summary["date_components"],
+                    "health_data_id": summary["health_data_id"],
+                },
+            ).first()
+            is not None
+        )
 
     def _check_duplicate_clinical_record(
-        self, session: Session, record: ClinicalRecord
-    ) -> ClinicalRecord | None:
+        self, session: Session, record: dict[str, Any]
+    ) -> bool:
         """Check if a clinical record already exists."""
-        return session.exec(
-            select(ClinicalRecord).where(
-                ClinicalRecord.identifier == record.identifier,
-                ClinicalRecord.health_data_id == record.health_data_id,
-            )
-        ).first()
+        return (
+            session.exec(
+                self._clinical_record_duplicate_query,
+                params={
+                    "identifier": record["identifier"],
+                    "health_data_id": record["health_data_id"],
+                },
+            ).first()
+            is not None
+        )
 
     def _check_duplicate_audiogram(
-        self, session: Session, audiogram: Audiogram
-    ) -> Audiogram | None:
-        """Check if an audiogram already exists."""
+        self, session: Session, audiogram: dict[str, Any]
+    ) -> int | None:
+        """Return the id of a matching audiogram, if one already exists."""
         return session.exec(
-            select(Audiogram).where(
-                Audiogram.type == audiogram.type,
-                Audiogram.start_date == audiogram.start_date,
-                Audiogram.end_date == audiogram.end_date,
-                Audiogram.health_data_id == audiogram.health_data_id,
-            )
+            self._audiogram_duplicate_query,
+            params={
+                "type": audiogram["type"],
+                "start_date": audiogram["start_date"],
+                "end_date": audiogram["end_date"],
+                "health_data_id": audiogram["health_data_id"],
+            },
         ).first()
 
     def _check_duplicate_vision_prescription(
-        self, session: Session, prescription: VisionPrescription
-    ) -> VisionPrescription | None:
-        """Check if a vision prescription already exists."""
+        self, session: Session, prescription: dict[str, Any]
+    ) -> int | None:
+        """Return the id of a matching vision prescription, if one already exists."""
         return session.exec(
-            select(VisionPrescription).where(
-                VisionPrescription.type == prescription.type,
-                VisionPrescription.date_issued == prescription.date_issued,
-                VisionPrescription.health_data_id == prescription.health_data_id,
-            )
+            self._vision_prescription_duplicate_query,
+            params={
+                "type": prescription["type"],
+                "date_issued": prescription["date_issued"],
+                "health_data_id": prescription["health_data_id"],
+            },
         ).first()
 
     def _check_duplicate_correlation_record(
         self, session: Session, correlation_id: int, record_id: int
-    ) -> CorrelationRecord | None:
+    ) -> bool:
         """Check if a correlation-record link already exists."""
-        return session.exec(
-            select(CorrelationRecord).where(
-                CorrelationRecord.correlation_id == correlation_id,
-                CorrelationRecord.record_id == record_id,
-            )
-        ).first()
+        return (
+            session.exec(
+                self._correlation_record_duplicate_query,
+                params={"correlation_id": correlation_id, "record_id": record_id},
+            ).first()
+            is not None
+        )
 
     def _check_duplicate_workout_route(
         self, session: Session, route: WorkoutRoute
-    ) -> WorkoutRoute | None:
+    ) -> bool:
         """Check if a workout route already exists."""
-        return session.exec(
-            select(WorkoutRoute).where(
-                WorkoutRoute.workout_id == route.workout_id,
-            )
-        ).first()
+        return (
+            session.exec(
+                self._workout_route_duplicate_query,
+                params={"workout_id": route.workout_id},
+            ).first()
+            is not None
+        )
 
-    def _check_duplicate_hrv_list(
-        self, session: Session, record_id: int
-    ) -> HeartRateVariabilityMetadataList | None:
-        """Check if an HRV list already exists for this record."""
+    def _check_duplicate_hrv_list(self, session: Session, record_id: int) -> int | None:
+        """Return the id of this record's HRV list, if one already exists."""
         return session.exec(
-            select(HeartRateVariabilityMetadataList).where(
-                HeartRateVariabilityMetadataList.record_id == record_id,
-            )
+            self._hrv_list_duplicate_query, params={"record_id": record_id}
         ).first()
 
-    # Parsing methods remain the same
-    def _parse_datetime(self, date_str: str, base_date: datetime | None = None) -> datetime:
-        """Parse datetime string from Apple Health format.
-        
+    def _parse_time_of_day(
+        self, time_str: str, base_date: datetime | None = None
+    ) -> datetime:
+        """Parse a time-only string such as "7:47:41.86 PM" on a base date.
+
+        Only used by InstantaneousBeatsPerMinute, so the standard datetime
+        format parsed for every other element skips these checks entirely.
+
         Args:
-            date_str: The datetime or time string to parse
-            base_date: Base date to use for time-only strings (for InstantaneousBeatsPerMinute)
+            time_str: The time string to parse
+            base_date: Base date to combine the time with
         """
-        # Check if this is a time-only format like "7:47:41.86 PM"
-        if base_date and ("AM" in date_str or "PM" in date_str) and ":" in date_str and "-" not in date_str:
-            # Parse time-only format and combine with base date
+        # Anything else than a time-only format is a regular datetime
+        if not (
+            base_date
+            and ("AM" in time_str or "PM" in time_str)
+            and ":" in time_str
+            and "-" not in time_str
+        ):
+            return _parse_apple_datetime(time_str)
+
+        try:
+            # Handle formats like "7:47:41.86 PM"
+            time_part = datetime.strptime(time_str, "%I:%M:%S.%f %p").time()
+        except ValueError:
             try:
-                # Handle formats like "7:47:41.86 PM"
-                time_part = datetime.strptime(date_str, "%I:%M:%S.%f %p").time()
+                # Fallback for formats like "7:47:41 PM" (no microseconds)
+                time_part = datetime.strptime(time_str, "%I:%M:%S %p").time()
             except ValueError:
-                try:
-                    # Fallback for formats like "7:47:41 PM" (no microseconds)
-                    time_part = datetime.strptime(date_str, "%I:%M:%S %p").time()
-                except ValueError:
-                    # If all fails, try without seconds
-                    time_part = datetime.strptime(date_str, "%I:%M %p").time()
-            
-            # Combine with base date
-            combined = datetime.combine(base_date.date(), time_part)
-            # Use the same timezone as base_date
-            return combined.replace(tzinfo=base_date.tzinfo)
-        else:
-            # Apple Health standard format: "2023-12-31 23:59:59 +0000"
-            dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S %z")
-            # Convert to preferred timezone
-            return dt.astimezone(ZoneInfo("Europe/Zurich"))
+                # If all fails, try without seconds
+                time_part = datetime.strptime(time_str, "%I:%M %p").time()
+
+        # Combine with base date, using the same timezone as base_date
+        combined = datetime.combine(base_date.date(), time_part)
+        return combined.replace(tzinfo=base_date.tzinfo)
 
-    def _parse_health_data(self, elem: Any) -> HealthData:
+    def _parse_health_data(self, attrs: Any) -> HealthData:
         """Parse HealthData root element."""
         # HealthData only has locale attribute
         # ExportDate and Me are child elements that we'll handle separately
         return HealthData(
-            locale=elem.get("locale", ""),
-            export_date=datetime.now(
-                ZoneInfo("Europe/Zurich")
-            ),  # Will be updated by ExportDate element
+            locale=attrs.get("locale", ""),
+            export_date=self.parse_started_at,  # Will be updated by ExportDate element
             date_of_birth="",  # Will be updated by Me element
             biological_sex="",  # Will be updated by Me element
             blood_type="",  # Will be updated by Me element
@@ -919,294 +1272,250 @@ class AppleHealthParser:
             cardio_fitness_medications_use="",  # Will be updated by Me element
         )
 
-    def _parse_record(self, elem: Any, health_data_id: int) -> Record:
-        """Parse Record element."""
-        return Record(
-            type=elem.get("type"),
-            source_name=elem.get("sourceName"),
-            source_version=elem.get("sourceVersion"),
-            device=elem.get("device"),
-            unit=elem.get("unit"),
-            value=elem.get("value"),
-            creation_date=self._parse_datetime(elem.get("creationDate"))
-            if elem.get("creationDate")
-            else None,
-            start_date=self._parse_datetime(elem.get("startDate")),
-            end_date=self._parse_datetime(elem.get("endDate")),
-            health_data_id=health_data_id,
-        )
+    def _parse_record(self, attrs: Any, health_data_id: int) -> dict[str, Any]:
+        """Parse Record element into a record row."""
+        # Records are most of an export, so callables are looked up once
+        get = attrs.get
+        parse_datetime = _parse_apple_datetime
+        return {
+            "type": get("type"),
+            "source_name": get("sourceName"),
+            "source_version": get("sourceVersion"),
+            "device": get("device"),
+            "unit": get("unit"),
+            "value": get("value"),
+            "creation_date": _maybe_datetime(get("creationDate")),
+            "start_date": parse_datetime(get("startDate")),
+            "end_date": parse_datetime(get("endDate")),
+            "health_data_id": health_data_id,
+        }
 
-    def _parse_correlation(self, elem: Any, health_data_id: int) -> Correlation:
-        """Parse Correlation element."""
-        return Correlation(
-            type=elem.get("type"),
-            source_name=elem.get("sourceName"),
-            source_version=elem.get("sourceVersion"),
-            device=elem.get("device"),
-            creation_date=self._parse_datetime(elem.get("creationDate"))
-            if elem.get("creationDate")
-            else None,
-            start_date=self._parse_datetime(elem.get("startDate")),
-            end_date=self._parse_datetime(elem.get("endDate")),
-            health_data_id=health_data_id,
-        )
+    def _parse_correlation(self, attrs: Any, health_data_id: int) -> dict[str, Any]:
+        """Parse Correlation element into a correlation row."""
+        get = attrs.get
+        return {
+            "type": get("type"),
+            "source_name": get("sourceName"),
+            "source_version": get("sourceVersion"),
+            "device": get("device"),
+            "creation_date": _maybe_datetime(get("creationDate")),
+            "start_date": _parse_apple_datetime(get("startDate")),
+            "end_date": _parse_apple_datetime(get("endDate")),
+            "health_data_id": health_data_id,
+        }
 
-    def _parse_workout(self, elem: Any, health_data_id: int) -> Workout:
-        """Parse Workout element."""
-        return Workout(
-            workout_activity_type=elem.get("workoutActivityType"),
-            duration=float(elem.get("duration")) if elem.get("duration") else None,
-            duration_unit=elem.get("durationUnit"),
-            total_distance=float(elem.get("totalDistance"))
-            if elem.get("totalDistance")
-            else None,
-            total_distance_unit=elem.get("totalDistanceUnit"),
-            total_energy_burned=float(elem.get("totalEnergyBurned"))
-            if elem.get("totalEnergyBurned")
-            else None,
-            total_energy_burned_unit=elem.get("totalEnergyBurnedUnit"),
-            source_name=elem.get("sourceName"),
-            source_version=elem.get("sourceVersion"),
-            device=elem.get("device"),
-            creation_date=self._parse_datetime(elem.get("creationDate"))
-            if elem.get("creationDate")
-            else None,
-            start_date=self._parse_datetime(elem.get("startDate")),
-            end_date=self._parse_datetime(elem.get("endDate")),
-            health_data_id=health_data_id,
-        )
+    def _parse_workout(self, attrs: Any, health_data_id: int) -> dict[str, Any]:
+        """Parse Workout element into a workout row."""
+        get = attrs.get
+        return {
+            "workout_activity_type": get("workoutActivityType"),
+            "duration": _maybe_float(get("duration")),
+            "duration_unit": get("durationUnit"),
+            "total_distance": _maybe_float(get("totalDistance")),
+            "total_distance_unit": get("totalDistanceUnit"),
+            "total_energy_burned": _maybe_float(get("totalEnergyBurned")),
+            "total_energy_burned_unit": get("totalEnergyBurnedUnit"),
+            "source_name": get("sourceName"),
+            "source_version": get("sourceVersion"),
+            "device": get("device"),
+            "creation_date": _maybe_datetime(get("creationDate")),
+            "start_date": _parse_apple_datetime(get("startDate")),
+            "end_date": _parse_apple_datetime(get("endDate")),
+            "health_data_id": health_data_id,
+        }
 
     def _parse_activity_summary(
-        self, elem: Any, health_data_id: int
-    ) -> ActivitySummary:
-        """Parse ActivitySummary element."""
-        return ActivitySummary(
-            date_components=elem.get("dateComponents"),
-            active_energy_burned=float(elem.get("activeEnergyBurned"))
-            if elem.get("activeEnergyBurned")
-            else None,
-            active_energy_burned_goal=float(elem.get("activeEnergyBurnedGoal"))
-            if elem.get("activeEnergyBurnedGoal")
-            else None,
-            active_energy_burned_unit=elem.get("activeEnergyBurnedUnit"),
-            apple_move_time=float(elem.get("appleMoveTime"))
-            if elem.get("appleMoveTime")
-            else None,
-            apple_move_time_goal=float(elem.get("appleMoveTimeGoal"))
-            if elem.get("appleMoveTimeGoal")
-            else None,
-            apple_exercise_time=float(elem.get("appleExerciseTime"))
-            if elem.get("appleExerciseTime")
-            else None,
-            apple_exercise_time_goal=float(elem.get("appleExerciseTimeGoal"))
-            if elem.get("appleExerciseTimeGoal")
-            else None,
-            apple_stand_hours=int(elem.get("appleStandHours"))
-            if elem.get("appleStandHours")
-            else None,
-            apple_stand_hours_goal=int(elem.get("appleStandHoursGoal"))
-            if elem.get("appleStandHoursGoal")
-            else None,
-            health_data_id=health_data_id,
-        )
+        self, attrs: Any, health_data_id: int
+    ) -> dict[str, Any]:
+        """Parse ActivitySummary element into a summary row."""
+        get = attrs.get
+        return {
+            "date_components": get("dateComponents"),
+            "active_energy_burned": _maybe_float(get("activeEnergyBurned")),
+            "active_energy_burned_goal": _maybe_float(get("activeEnergyBurnedGoal")),
+            "active_energy_burned_unit": get("activeEnergyBurnedUnit"),
+            "apple_move_time": _maybe_float(get("appleMoveTime")),
+            "apple_move_time_goal": _maybe_float(get("appleMoveTimeGoal")),
+            "apple_exercise_time": _maybe_float(get("appleExerciseTime")),
+            "apple_exercise_time_goal": _maybe_float(get("appleExerciseTimeGoal")),
+            "apple_stand_hours": _maybe_int(get("appleStandHours")),
+            "apple_stand_hours_goal": _maybe_int(get("appleStandHoursGoal")),
+            "health_data_id": health_data_id,
+        }
 
-    def _parse_clinical_record(self, elem: Any, health_data_id: int) -> ClinicalRecord:
-        """Parse ClinicalRecord element."""
-        return ClinicalRecord(
-            type=elem.get("type"),
-            identifier=elem.get("identifier"),
-            source_name=elem.get("sourceName"),
-            source_url=elem.get("sourceURL"),
-            fhir_version=elem.get("fhirVersion"),
-            received_date=self._parse_datetime(elem.get("receivedDate")),
-            resource_file_path=elem.get("resourceFilePath"),
-            health_data_id=health_data_id,
-        )
+    def _parse_clinical_record(self, attrs: Any, health_data_id: int) -> dict[str, Any]:
+        """Parse ClinicalRecord element into a clinical record row."""
+        get = attrs.get
+        return {
+            "type": get("type"),
+            "identifier": get("identifier"),
+            "source_name": get("sourceName"),
+            "source_url": get("sourceURL"),
+            "fhir_version": get("fhirVersion"),
+            "received_date": _parse_apple_datetime(get("receivedDate")),
+            "resource_file_path": get("resourceFilePath"),
+            "health_data_id": health_data_id,
+        }
 
-    def _parse_audiogram(self, elem: Any, health_data_id: int) -> Audiogram:
-        """Parse Audiogram element."""
-        return Audiogram(
-            type=elem.get("type"),
-            source_name=elem.get("sourceName"),
-            source_version=elem.get("sourceVersion"),
-            device=elem.get("device"),
-            creation_date=self._parse_datetime(elem.get("creationDate"))
-            if elem.get("creationDate")
-            else None,
-            start_date=self._parse_datetime(elem.get("startDate")),
-            end_date=self._parse_datetime(elem.get("endDate")),
-            health_data_id=health_data_id,
-        )
+    def _parse_audiogram(self, attrs: Any, health_data_id: int) -> dict[str, Any]:
+        """Parse Audiogram element into an audiogram row."""
+        get = attrs.get
+        return {
+            "type": get("type"),
+            "source_name": get("sourceName"),
+            "source_version": get("sourceVersion"),
+            "device": get("device"),
+            "creation_date": _maybe_datetime(get("creationDate")),
+            "start_date": _parse_apple_datetime(get("startDate")),
+            "end_date": _parse_apple_datetime(get("endDate")),
+            "health_data_id": health_data_id,
+        }
 
     def _parse_vision_prescription(
-        self, elem: Any, health_data_id: int
-    ) -> VisionPrescription:
-        """Parse VisionPrescription element."""
-        return VisionPrescription(
-            type=elem.get("type"),
-            date_issued=self._parse_datetime(elem.get("dateIssued")),
-            expiration_date=self._parse_datetime(elem.get("expirationDate"))
-            if elem.get("expirationDate")
-            else None,
-            brand=elem.get("brand"),
-            health_data_id=health_data_id,
-        )
+        self, attrs: Any, health_data_id: int
+    ) -> dict[str, Any]:
+        """Parse VisionPrescription element into a prescription row."""
+        return {
+            "type": attrs.get("type"),
+            "date_issued": _parse_apple_datetime(attrs.get("dateIssued")),
+            "expiration_date": _maybe_datetime(attrs.get("expirationDate")),
+            "brand": attrs.get("brand"),
+            "health_data_id": health_data_id,
+        }
 
-    def _parse_workout_event(self, elem: Any, workout_id: int) -> WorkoutEvent:
+    def _parse_workout_event(self, attrs: Any, workout_id: int) -> dict[str, Any]:
         """Parse WorkoutEvent element."""
-        return WorkoutEvent(
-            type=elem.get("type"),
-            date=self._parse_datetime(elem.get("date")),
-            duration=float(elem.get("duration")) if elem.get("duration") else None,
-            duration_unit=elem.get("durationUnit"),
-            workout_id=workout_id,
-        )
+        return {
+            "type": attrs.get("type"),
+            "date": _parse_apple_datetime(attrs.get("date")),
+            "duration": _maybe_float(attrs.get("duration")),
+            "duration_unit": attrs.get("durationUnit"),
+            "workout_id": workout_id,
+        }
 
-    def _parse_workout_statistics(
-        self, elem: Any, workout_id: int
-    ) -> WorkoutStatistics:
+    def _parse_workout_statistics(self, attrs: Any, workout_id: int) -> dict[str, Any]:
         """Parse WorkoutStatistics element."""
-        return WorkoutStatistics(
-            type=elem.get("type"),
-            start_date=self._parse_datetime(elem.get("startDate")),
-            end_date=self._parse_datetime(elem.get("endDate")),
-            average=float(elem.get("average")) if elem.get("average") else None,
-            minimum=float(elem.get("minimum")) if elem.get("minimum") else None,
-            maximum=float(elem.get("maximum")) if elem.get("maximum") else None,
-            sum=float(elem.get("sum")) if elem.get("sum") else None,
-            unit=elem.get("unit"),
-            workout_id=workout_id,
-        )
+        get = attrs.get
+        return {
+            "type": get("type"),
+            "start_date": _parse_apple_datetime(get("startDate")),
+            "end_date": _parse_apple_datetime(get("endDate")),
+            "average": _maybe_float(get("average")),
+            "minimum": _maybe_float(get("minimum")),
+            "maximum": _maybe_float(get("maximum")),
+            "sum": _maybe_float(get("sum")),
+            "unit": get("unit"),
+            "workout_id": workout_id,
+        }
 
-    def _parse_workout_route(self, elem: Any, workout_id: int) -> WorkoutRoute:
+    def _parse_workout_route(self, attrs: Any, workout_id: int) -> WorkoutRoute:
         """Parse WorkoutRoute element."""
+        get = attrs.get
         return WorkoutRoute(
-            source_name=elem.get("sourceName"),
-            source_version=elem.get("sourceVersion"),
-            device=elem.get("device"),
-            creation_date=self._parse_datetime(elem.get("creationDate"))
-            if elem.get("creationDate")
-            else None,
-            start_date=self._parse_datetime(elem.get("startDate")),
-            end_date=self._parse_datetime(elem.get("endDate")),
-            file_path=elem.get("filePath"),
+            source_name=get("sourceName"),
+            source_version=get("sourceVersion"),
+            device=get("device"),
+            creation_date=_maybe_datetime(get("creationDate")),
+            start_date=_parse_apple_datetime(get("startDate")),
+            end_date=_parse_apple_datetime(get("endDate")),
+            file_path=get("filePath"),
             workout_id=workout_id,
         )
 
-    def _parse_sensitivity_point(
-        self, elem: Any, audiogram_id: int
-    ) -> SensitivityPoint:
+    def _parse_sensitivity_point(self, attrs: Any, audiogram_id: int) -> dict[str, Any]:
         """Parse SensitivityPoint element."""
-        return SensitivityPoint(
-            frequency_value=float(elem.get("frequencyValue")),
-            frequency_unit=elem.get("frequencyUnit"),
-            left_ear_value=float(elem.get("leftEarValue"))
-            if elem.get("leftEarValue")
-            else None,
-            left_ear_unit=elem.get("leftEarUnit"),
-            left_ear_masked=elem.get("leftEarMasked") == "true"
-            if elem.get("leftEarMasked")
-            else None,
-            left_ear_clamping_range_lower_bound=float(
-                elem.get("leftEarClampingRangeLowerBound")
-            )
-            if elem.get("leftEarClampingRangeLowerBound")
-            else None,
-            left_ear_clamping_range_upper_bound=float(
-                elem.get("leftEarClampingRangeUpperBound")
-            )
-            if elem.get("leftEarClampingRangeUpperBound")
-            else None,
-            right_ear_value=float(elem.get("rightEarValue"))
-            if elem.get("rightEarValue")
-            else None,
-            right_ear_unit=elem.get("rightEarUnit"),
-            right_ear_masked=elem.get("rightEarMasked") == "true"
-            if elem.get("rightEarMasked")
-            else None,
-            right_ear_clamping_range_lower_bound=float(
-                elem.get("rightEarClampingRangeLowerBound")
-            )
-            if elem.get("rightEarClampingRangeLowerBound")
-            else None,
-            right_ear_clamping_range_upper_bound=float(
-                elem.get("rightEarClampingRangeUpperBound")
-            )
-            if elem.get("rightEarClampingRangeUpperBound")
-            else None,
-            audiogram_id=audiogram_id,
-        )
+        get = attrs.get
+        return {
+            "frequency_value": float(get("frequencyValue")),
+            "frequency_unit": get("frequencyUnit"),
+            "left_ear_value": _maybe_float(get("leftEarValue")),
+            "left_ear_unit": get("leftEarUnit"),
+            "left_ear_masked": _maybe_bool(get("leftEarMasked")),
+            "left_ear_clamping_range_lower_bound": _maybe_float(
+                get("leftEarClampingRangeLowerBound")
+            ),
+            "left_ear_clamping_range_upper_bound": _maybe_float(
+                get("leftEarClampingRangeUpperBound")
+            ),
+            "right_ear_value": _maybe_float(get("rightEarValue")),
+            "right_ear_unit": get("rightEarUnit"),
+            "right_ear_masked": _maybe_bool(get("rightEarMasked")),
+            "right_ear_clamping_range_lower_bound": _maybe_float(
+                get("rightEarClampingRangeLowerBound")
+            ),
+            "right_ear_clamping_range_upper_bound": _maybe_float(
+                get("rightEarClampingRangeUpperBound")
+            ),
+            "audiogram_id": audiogram_id,
+        }
 
     def _parse_eye_prescription(
-        self, elem: Any, vision_prescription_id: int
-    ) -> EyePrescription:
+        self, attrs: Any, vision_prescription_id: int
+    ) -> dict[str, Any]:
         """Parse Prescription (eye) element."""
-        eye_side = EyeSide.LEFT if elem.get("eye") == "left" else EyeSide.RIGHT
-
-        return EyePrescription(
-            eye_side=eye_side,
-            sphere=float(elem.get("sphere")) if elem.get("sphere") else None,
-            sphere_unit=elem.get("sphereUnit"),
-            cylinder=float(elem.get("cylinder")) if elem.get("cylinder") else None,
-            cylinder_unit=elem.get("cylinderUnit"),
-            axis=float(elem.get("axis")) if elem.get("axis") else None,
-            axis_unit=elem.get("axisUnit"),
-            add=float(elem.get("add")) if elem.get("add") else None,
-            add_unit=elem.get("addUnit"),
-            vertex=float(elem.get("vertex")) if elem.get("vertex") else None,
-            vertex_unit=elem.get("vertexUnit"),
-            prism_amount=float(elem.get("prismAmount"))
-            if elem.get("prismAmount")
-            else None,
-            prism_amount_unit=elem.get("prismAmountUnit"),
-            prism_angle=float(elem.get("prismAngle"))
-            if elem.get("prismAngle")
-            else None,
-            prism_angle_unit=elem.get("prismAngleUnit"),
-            far_pd=float(elem.get("farPD")) if elem.get("farPD") else None,
-            far_pd_unit=elem.get("farPDUnit"),
-            near_pd=float(elem.get("nearPD")) if elem.get("nearPD") else None,
-            near_pd_unit=elem.get("nearPDUnit"),
-            base_curve=float(elem.get("baseCurve")) if elem.get("baseCurve") else None,
-            base_curve_unit=elem.get("baseCurveUnit"),
-            diameter=float(elem.get("diameter")) if elem.get("diameter") else None,
-            diameter_unit=elem.get("diameterUnit"),
-            vision_prescription_id=vision_prescription_id,
-        )
+        get = attrs.get
+        eye_side = _EYE_MAP.get(get("eye"), EyeSide.RIGHT)
+
+        return {
+            "eye_side": eye_side,
+            "sphere": _maybe_float(get("sphere")),
+            "sphere_unit": get("sphereUnit"),
+            "cylinder": _maybe_float(get("cylinder")),
+            "cylinder_unit": get("cylinderUnit"),
+            "axis": _maybe_float(get("axis")),
+            "axis_unit": get("axisUnit"),
+            "add": _maybe_float(get("add")),
+            "add_unit": get("addUnit"),
+            "vertex": _maybe_float(get("vertex")),
+            "vertex_unit": get("vertexUnit"),
+            "prism_amount": _maybe_float(get("prismAmount")),
+            "prism_amount_unit": get("prismAmountUnit"),
+            "prism_angle": _maybe_float(get("prismAngle")),
+            "prism_angle_unit": get("prismAngleUnit"),
+            "far_pd": _maybe_float(get("farPD")),
+            "far_pd_unit": get("farPDUnit"),
+            "near_pd": _maybe_float(get("nearPD")),
+            "near_pd_unit": get("nearPDUnit"),
+            "base_curve": _maybe_float(get("baseCurve")),
+            "base_curve_unit": get("baseCurveUnit"),
+            "diameter": _maybe_float(get("diameter")),
+            "diameter_unit": get("diameterUnit"),
+            "vision_prescription_id": vision_prescription_id,
+        }
 
     def _parse_vision_attachment(
-        self, elem: Any, vision_prescription_id: int
-    ) -> VisionAttachment:
+        self, attrs: Any, vision_prescription_id: int
+    ) -> dict[str, Any]:
         """Parse Attachment element."""
-        return VisionAttachment(
-            identifier=elem.get("identifier"),
-            vision_prescription_id=vision_prescription_id,
-        )
+        return {
+            "identifier": attrs.get("identifier"),
+            "vision_prescription_id": vision_prescription_id,
+        }
 
     def _parse_metadata_entry(
-        self, elem: Any, parent_type: str, parent_id: int
-    ) -> MetadataEntry:
+        self, attrs: Any, parent_type: str, parent_id: int
+    ) -> dict[str, Any]:
         """Parse MetadataEntry element."""
-        return MetadataEntry(
-            key=elem.get("key"),
-            value=elem.get("value"),
-            parent_type=parent_type,
-            parent_id=parent_id,
-        )
+        return {
+            "key": attrs.get("key"),
+            "value": attrs.get("value"),
+            "parent_type": parent_type,
+            "parent_id": parent_id,
+        }
 
-    def _parse_hrv_list(self, record_id: int) -> HeartRateVariabilityMetadataList:
-        """Parse HeartRateVariabilityMetadataList element."""
-        return HeartRateVariabilityMetadataList(record_id=record_id)
+    def _parse_hrv_list(self, record_id: int) -> dict[str, Any]:
+        """Parse HeartRateVariabilityMetadataList element into an HRV list row."""
+        return {"record_id": record_id}
 
     def _parse_instantaneous_bpm(
-        self, elem: Any, hrv_list_id: int, base_date: datetime | None = None
-    ) -> InstantaneousBeatsPerMinute:
+        self, attrs: Any, hrv_list_id: int, base_date: datetime | None = None
+    ) -> dict[str, Any]:
         """Parse InstantaneousBeatsPerMinute element."""
-        return InstantaneousBeatsPerMinute(
-            bpm=int(elem.get("bpm")),
-            time=self._parse_datetime(elem.get("time"), base_date),
-            hrv_list_id=hrv_list_id,
-        )
+        return {
+            "bpm": int(attrs.get("bpm")),
+            "time": self._parse_time_of_day(attrs.get("time"), base_date),
+            "hrv_list_id": hrv_list_id,
+        }
 
 
 if __name__ == "__main__":